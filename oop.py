@@ -1,253 +1,469 @@
-from abc import ABC, abstractmethod
+from __future__ import annotations
+
+import atexit
+from collections import deque
+from dataclasses import dataclass
 from datetime import datetime
+from enum import IntEnum
+from functools import lru_cache
+from math import isfinite
 import json
+from json.encoder import encode_basestring
+import logging
+import logging.handlers
+from operator import itemgetter
+import sys
+import time
+from typing import Any, Callable, ClassVar, Iterable, Iterator, Protocol, TypeVar, runtime_checkable
+from weakref import WeakValueDictionary
+
+# Вывод в текущий sys.stdout: поток берётся при каждой записи, а не при импорте,
+# поэтому перенаправление stdout (redirect_stdout, перехват в тестах) работает
+class _StdoutHandler(logging.StreamHandler):
+    def emit(self, record: logging.LogRecord) -> None:
+        self.stream = sys.stdout
+        super().emit(record)
+
+# Журнал: записи копятся в памяти и выводятся одной пачкой
+_log = logging.getLogger("orders")
+_log.setLevel(logging.DEBUG)
+_log.propagate = False
+_mem = logging.handlers.MemoryHandler(capacity=1024, target=_StdoutHandler())
+_log.addHandler(_mem)
+atexit.register(_mem.flush)
+
+def flush_logs() -> None:
+    _mem.flush()
+
+# Строки кавычатся C-функцией json, остальные значения — общим JSONEncoder
+_dumps = json.JSONEncoder(ensure_ascii=False).encode
+
+def _json_value(value: Any) -> str:
+    if value.__class__ is str:
+        return encode_basestring(value)
+    return _dumps(value)
+
+# repr совпадает с JSON только для int и конечных float
+def _json_number(value: Any) -> str:
+    if value.__class__ is int or (value.__class__ is float and isfinite(value)):
+        return repr(value)
+    return _dumps(value)
+
+# Разбор дат: одинаковые метки времени разбираются один раз
+@lru_cache(maxsize=4096)
+def _parse_iso(s: str) -> datetime:
+    return datetime.fromisoformat(s)
+
+# Интернируются только строки, остальные значения передаются как есть
+def _intern_str(value: Any) -> Any:
+    if value.__class__ is str:
+        return sys.intern(value)
+    return value
+
+_OrderT = TypeVar("_OrderT", bound="type[Order]")
+
+# Генерация to_dict/from_dict/_to_json по списку полей при создании класса.
+# Порядок полей должен совпадать с порядком аргументов конструктора.
+# Для JSON заранее собирается шаблон записи, куда подставляются только значения.
+# Шаблон выгоден только для скалярных полей: вложенные списки и словари всё равно
+# кодируются JSONEncoder'ом по одному на запись, поэтому для них json_template=False.
+def codegen_serializers(
+    type_: str,
+    fields: list[str],
+    date_field: str = "order_date",
+    intern_field: str = "status",
+    number_fields: tuple[str, ...] = ("order_id", "price"),
+    json_template: bool = True,
+) -> Callable[[_OrderT], _OrderT]:
+    for special in (date_field, intern_field, *number_fields):
+        if special not in fields:
+            raise ValueError(f"Поле {special!r} отсутствует в списке полей {fields!r}")
+
+    def decorate(cls: _OrderT) -> _OrderT:
+        for method in ("to_dict", "from_dict", "_to_json"):
+            if method in cls.__dict__:
+                raise TypeError(f"{cls.__name__}.{method} генерируется автоматически и не должен быть определён в классе")
+        values: list[str] = []
+        args: list[str] = []
+        template = [f"{_dumps('type')}: {_dumps(type_)}".replace("%", "%%")]
+        json_values: list[str] = []
+        for name in fields:
+            key = _dumps(name).replace("%", "%%")
+            # Поля-свойства читаются напрямую из слота, без вызова дескриптора
+            attr = name
+            if isinstance(getattr(cls, name, None), property) and hasattr(cls, f"_{name}"):
+                attr = f"_{name}"
+            if name == date_field:
+                values.append(f"{name!r}: self.{attr}.isoformat()")
+                args.append(f"_parse_iso({name})")
+                json_values.append(f"_quote(self.{attr}.isoformat())")
+            else:
+                values.append(f"{name!r}: self.{attr}")
+                args.append(f"_intern({name})" if name == intern_field else name)
+                json_values.append(f"_json_number(self.{attr})" if name in number_fields else f"_json_value(self.{attr})")
+            template.append(f"{key}: %s")
+        src = (
+            f"def to_dict(self):\n"
+            f"    return {{'type': {type_!r}, {', '.join(values)}}}\n"
+            f"def from_dict(cls, data):\n"
+            f"    {', '.join(fields)}, = _getter(data)\n"
+            f"    return cls({', '.join(args)})\n"
+        )
+        if json_template:
+            src += (
+                f"def _to_json(self):\n"
+                f"    return _template % ({', '.join(json_values)},)\n"
+            )
+        ns: dict[str, Any] = {
+            "_getter": itemgetter(*fields),
+            "_parse_iso": _parse_iso,
+            "_intern": _intern_str,
+            "_quote": encode_basestring,
+            "_json_value": _json_value,
+            "_json_number": _json_number,
+            "_template": "{" + ", ".join(template) + "}",
+        }
+        exec(compile(src, f"<codegen {cls.__name__}>", "exec"), ns)
+        for func in (ns["to_dict"], ns["from_dict"], ns.get("_to_json")):
+            if func is not None:
+                func.__qualname__ = f"{cls.__qualname__}.{func.__name__}"
+        cls._TYPE = type_
+        cls._JSON_TEMPLATE = json_template
+        setattr(cls, "to_dict", ns["to_dict"])
+        setattr(cls, "from_dict", classmethod(ns["from_dict"]))
+        if json_template:
+            setattr(cls, "_to_json", ns["_to_json"])
+        return cls
+    return decorate
 
 # Исключения
 class InvalidOrderError(Exception):
     pass
 
-# Интерфейс заказа
-class Order(ABC):
-    def __init__(self, order_id, price, customer, order_date, status):
+# Базовый класс заказа
+class Order:
+    __slots__ = ("_order_id", "price", "customer", "order_date", "_status", "_status_str")
+
+    _TYPE: ClassVar[str]
+    _STATUS_TEMPLATE: ClassVar[str | None] = None
+    _JSON_TEMPLATE: ClassVar[bool] = False
+
+    _order_id: int
+    price: float
+    customer: str
+    order_date: datetime
+    _status: str
+    _status_str: str | None
+
+    def __init__(self, order_id: int, price: float, customer: str, order_date: datetime, status: str) -> None:
         self.order_id = order_id
         self.price = price
         self.customer = customer
         self.order_date = order_date
         self.status = status
 
-    @abstractmethod
-    def track_status(self):
-        pass
+    # Строка статуса кэшируется и сбрасывается при смене номера или статуса
+    @property
+    def order_id(self) -> int:
+        return self._order_id
+
+    @order_id.setter
+    def order_id(self, value: int) -> None:
+        self._order_id = value
+        self._status_str = None
+
+    @property
+    def status(self) -> str:
+        return self._status
+
+    @status.setter
+    def status(self, value: str) -> None:
+        self._status = value
+        self._status_str = None
 
-    @abstractmethod
-    def to_dict(self):
-        pass
+    def track_status(self) -> str:
+        if self._status_str is None:
+            template = self._STATUS_TEMPLATE
+            if template is None:
+                raise NotImplementedError
+            self._status_str = template.format(self._order_id, self._status)
+        return self._status_str
+
+    def to_dict(self) -> dict[str, Any]:
+        raise NotImplementedError
 
     @classmethod
-    @abstractmethod
-    def from_dict(cls, data):
-        pass
+    def from_dict(cls, data: dict[str, Any]) -> Order:
+        raise NotImplementedError
+
+    def _to_json(self) -> str:
+        raise NotImplementedError
 
 # Интерфейс логирования
-class Logger(ABC):
-    @abstractmethod
-    def log_action(self, order_id, action):
-        pass
+@runtime_checkable
+class Logger(Protocol):
+    def log_action(self, order_id: int, action: str) -> None: ...
 
 # Интерфейс уведомлений
-class Notifier(ABC):
-    @abstractmethod
-    def send_notification(self, order_id):
-        pass
+@runtime_checkable
+class Notifier(Protocol):
+    def send_notification(self, order_id: int) -> None: ...
 
 # Интерфейс сериализации
-class Serializable(ABC):
-    @abstractmethod
-    def to_dict(self):
-        pass
+@runtime_checkable
+class Serializable(Protocol):
+    def to_dict(self) -> dict[str, Any]: ...
 
     @classmethod
-    @abstractmethod
-    def from_dict(cls, data):
-        pass
+    def from_dict(cls, data: dict[str, Any]) -> Serializable: ...
 
 # Миксин логирования
-class LoggingMixin(Logger):
-    def log_action(self, order_id, action):
-        print(f"[LOG] Order {order_id}: {action}")
+class LoggingMixin:
+    __slots__ = ()
+
+    def log_action(self, order_id: int, action: str) -> None:
+        _log.info("[LOG] Order %s: %s", order_id, action)
+
+# Канал уведомлений: свой логгер, не зависящий от настроек журнала действий
+_notify_log = logging.getLogger("orders.notify")
+_notify_log.setLevel(logging.INFO)
+_notify_log.propagate = False
+_notify_log.addHandler(_StdoutHandler())
+
+def _send_notifications(order_ids: list[int]) -> None:
+    _notify_log.info("[NOTIFY] Уведомления по заказам %s отправлены", ", ".join(map(str, order_ids)))
+
+# Пакетная отправка уведомлений: одна отправка на пачку заказов через sink.
+# max_wait_time проверяется только при следующем add(): таймера нет,
+# неполная пачка ждёт очередного заказа, явного flush() или выхода из программы.
+class NotificationBatcher:
+    __slots__ = ("_buf", "_max", "_max_wait", "_started", "_sink")
+
+    def __init__(
+        self,
+        max_batch_size: int = 100,
+        max_wait_time: float = 1.0,
+        sink: Callable[[list[int]], None] = _send_notifications,
+    ) -> None:
+        self._buf: list[int] = []
+        self._max = max_batch_size
+        self._max_wait = max_wait_time
+        self._started = 0.0
+        self._sink = sink
+
+    def add(self, order_id: int) -> None:
+        if not self._buf:
+            self._started = time.monotonic()
+        self._buf.append(order_id)
+        if len(self._buf) >= self._max or time.monotonic() - self._started >= self._max_wait:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buf:
+            return
+        order_ids, self._buf = self._buf, []
+        self._sink(order_ids)
+
+_notifier = NotificationBatcher()
+atexit.register(_notifier.flush)
 
 # Миксин уведомлений
-class NotificationMixin(Notifier):
-    def send_notification(self, order_id):
-        print(f"[NOTIFY] Уведомление по заказу {order_id} отправлено")
+class NotificationMixin:
+    __slots__ = ()
+
+    def send_notification(self, order_id: int) -> None:
+        _notifier.add(order_id)
 
 # Адрес
+@dataclass(frozen=True, slots=True, weakref_slot=True)
 class Address:
-    def __init__(self, street, city, zip_code, country):
-        self.street = street
-        self.city = city
-        self.zip_code = zip_code
-        self.country = country
+    street: str
+    city: str
+    zip_code: str
+    country: str
 
-    def __str__(self):
+    def __str__(self) -> str:
         return f"{self.street}, {self.city}, {self.zip_code}, {self.country}"
 
+# Одинаковые адреса разделяют один объект, пока он кому-то нужен
+_addresses: WeakValueDictionary[tuple[str, str, str, str], Address] = WeakValueDictionary()
+
+def make_address(street: str, city: str, zip_code: str, country: str) -> Address:
+    key = (street, city, zip_code, country)
+    address = _addresses.get(key)
+    if address is None:
+        address = _addresses[key] = Address(street, city, zip_code, country)
+    return address
+
+# Кодировщик JSON: заказы превращаются в словари по одному прямо во время обхода,
+# поэтому список всех словарей целиком не строится
+class OrderEncoder(json.JSONEncoder):
+    def default(self, o: Any) -> Any:
+        if isinstance(o, Order):
+            return o.to_dict()
+        return super().default(o)
+
+_encode_orders = OrderEncoder(ensure_ascii=False).encode
+
 # Клиент
 class Customer:
-    def __init__(self, name, email, phone, address):
+    __slots__ = ("name", "email", "phone", "address", "order_history")
+
+    def __init__(self, name: str, email: str, phone: str, address: Address) -> None:
         self.name = name
         self.email = email
         self.phone = phone
         self.address = address
-        self.order_history = []
+        self.order_history: deque[Order] = deque()
 
-    def place_order(self, order):
+    def place_order(self, order: Order) -> None:
         self.order_history.append(order)
 
-    def get_order_history(self):
-        return self.order_history
+    def get_order_history(self) -> Iterator[Order]:
+        return iter(self.order_history)
+
+    def serialize_all(self) -> list[dict[str, Any]]:
+        return [order.to_dict() for order in self.order_history]
+
+    # Шаблоны используются, только если они есть у всех заказов, иначе — OrderEncoder
+    def serialize_json(self) -> bytes:
+        history = self.order_history
+        if all(order._JSON_TEMPLATE for order in history):
+            return ("[" + ", ".join([order._to_json() for order in history]) + "]").encode("utf-8")
+        return _encode_orders(list(history)).encode("utf-8")
 
 # Конкретные типы заказов
-class OnlineOrder(Order, LoggingMixin, NotificationMixin, Serializable):
-    def __init__(self, order_id, price, customer, order_date, status, items, payment_method):
+@codegen_serializers(
+    "online",
+    ["order_id", "price", "customer", "order_date", "status", "items", "payment_method"],
+    json_template=False,
+)
+class OnlineOrder(Order, LoggingMixin, NotificationMixin):
+    __slots__ = ("items", "payment_method")
+    _STATUS_TEMPLATE = "Онлайн-заказ {} сейчас в статусе '{}'"
+
+    def __init__(
+        self, order_id: int, price: float, customer: str, order_date: datetime, status: str,
+        items: list[dict[str, Any]], payment_method: str,
+    ) -> None:
         super().__init__(order_id, price, customer, order_date, status)
         self.items = items
         self.payment_method = payment_method
 
-    def track_status(self):
-        return f"Онлайн-заказ {self.order_id} сейчас в статусе '{self.status}'"
-
-    def to_dict(self):
-        return {
-            "type": "online",
-            "order_id": self.order_id,
-            "price": self.price,
-            "customer": self.customer,
-            "order_date": self.order_date.isoformat(),
-            "status": self.status,
-            "items": self.items,
-            "payment_method": self.payment_method,
-        }
+@codegen_serializers("phone", ["order_id", "price", "customer", "order_date", "status", "operator_name"])
+class PhoneOrder(Order, LoggingMixin, NotificationMixin):
+    __slots__ = ("operator_name",)
+    _STATUS_TEMPLATE = "Телефонный заказ {} сейчас в статусе '{}'"
 
-    @classmethod
-    def from_dict(cls, data):
-        return cls(
-            order_id=data["order_id"],
-            price=data["price"],
-            customer=data["customer"],
-            order_date=datetime.fromisoformat(data["order_date"]),
-            status=data["status"],
-            items=data["items"],
-            payment_method=data["payment_method"],
-        )
-
-class PhoneOrder(Order, LoggingMixin, NotificationMixin, Serializable):
-    def __init__(self, order_id, price, customer, order_date, status, operator_name):
+    def __init__(
+        self, order_id: int, price: float, customer: str, order_date: datetime, status: str, operator_name: str
+    ) -> None:
         super().__init__(order_id, price, customer, order_date, status)
         self.operator_name = operator_name
 
-    def track_status(self):
-        return f"Телефонный заказ {self.order_id} сейчас в статусе '{self.status}'"
-
-    def to_dict(self):
-        return {
-            "type": "phone",
-            "order_id": self.order_id,
-            "price": self.price,
-            "customer": self.customer,
-            "order_date": self.order_date.isoformat(),
-            "status": self.status,
-            "operator_name": self.operator_name,
-        }
+@codegen_serializers("store", ["order_id", "price", "customer", "order_date", "status", "store_location"])
+class StoreOrder(Order, LoggingMixin, NotificationMixin):
+    __slots__ = ("store_location",)
+    _STATUS_TEMPLATE = "Магазинный заказ {} сейчас в статусе '{}'"
 
-    @classmethod
-    def from_dict(cls, data):
-        return cls(
-            order_id=data["order_id"],
-            price=data["price"],
-            customer=data["customer"],
-            order_date=datetime.fromisoformat(data["order_date"]),
-            status=data["status"],
-            operator_name=data["operator_name"],
-        )
-
-class StoreOrder(Order, LoggingMixin, NotificationMixin, Serializable):
-    def __init__(self, order_id, price, customer, order_date, status, store_location):
+    def __init__(
+        self, order_id: int, price: float, customer: str, order_date: datetime, status: str, store_location: str
+    ) -> None:
         super().__init__(order_id, price, customer, order_date, status)
         self.store_location = store_location
 
-    def track_status(self):
-        return f"Магазинный заказ {self.order_id} сейчас в статусе '{self.status}'"
-
-    def to_dict(self):
-        return {
-            "type": "store",
-            "order_id": self.order_id,
-            "price": self.price,
-            "customer": self.customer,
-            "order_date": self.order_date.isoformat(),
-            "status": self.status,
-            "store_location": self.store_location,
-        }
-
-    @classmethod
-    def from_dict(cls, data):
-        return cls(
-            order_id=data["order_id"],
-            price=data["price"],
-            customer=data["customer"],
-            order_date=datetime.fromisoformat(data["order_date"]),
-            status=data["status"],
-            store_location=data["store_location"],
-        )
+_ORDER_TYPES: dict[str, type[Order]] = {cls._TYPE: cls for cls in (OnlineOrder, PhoneOrder, StoreOrder)}
 
 # Фабрика заказов
 class OrderFactory:
     @staticmethod
-    def create_order(order_type):
-        if order_type == "online":
-            return OnlineOrder
-        elif order_type == "phone":
-            return PhoneOrder
-        elif order_type == "store":
-            return StoreOrder
-        else:
-            raise InvalidOrderError(f"Неизвестный тип заказа: {order_type}")
+    def create_order(order_type: str) -> type[Order]:
+        try:
+            return _ORDER_TYPES[order_type]
+        except KeyError:
+            raise InvalidOrderError(f"Неизвестный тип заказа: {order_type}") from None
 
 # Цепочка обязанностей: отмена заказа
 class CancellationRequest:
-    def __init__(self, order, reason):
+    __slots__ = ("order", "reason", "approved")
+
+    def __init__(self, order: Order, reason: str) -> None:
         self.order = order
         self.reason = reason
         self.approved = False
 
-class Handler(ABC):
-    def __init__(self):
-        self._next_handler = None
+# Решение обработчика: передать дальше, одобрить или отклонить
+class Decision(IntEnum):
+    PASS = 0
+    APPROVE = 1
+    REJECT = 2
 
-    def set_next(self, handler):
-        self._next_handler = handler
-        return handler
+# Интерфейс обработчика
+@runtime_checkable
+class Handler(Protocol):
+    def check(self, request: CancellationRequest) -> Decision: ...
 
-    @abstractmethod
-    def handle(self, request):
-        pass
+class CallCenterOperator:
+    __slots__ = ()
 
-class CallCenterOperator(Handler):
-    def handle(self, request):
-        print("Оператор проверяет запрос...")
+    def check(self, request: CancellationRequest) -> Decision:
+        _log.debug("Оператор проверяет запрос...")
         if request.reason:
-            print("Оператор передает дальше")
-            if self._next_handler:
-                return self._next_handler.handle(request)
-        else:
-            print("Оператор отклонил запрос")
-
-class Manager(Handler):
-    def handle(self, request):
-        print("Менеджер рассматривает запрос...")
+            _log.debug("Оператор передает дальше")
+            return Decision.PASS
+        _log.debug("Оператор отклонил запрос")
+        return Decision.REJECT
+
+class Manager:
+    __slots__ = ()
+
+    def check(self, request: CancellationRequest) -> Decision:
+        _log.debug("Менеджер рассматривает запрос...")
         if request.order.price > 500:
-            print("Менеджер требует одобрения администратора")
-            if self._next_handler:
-                return self._next_handler.handle(request)
-        else:
-            print("Менеджер одобрил отмену заказа")
-            request.approved = True
-
-class Admin(Handler):
-    def handle(self, request):
-        print("Администратор окончательно одобряет отмену")
-        request.approved = True
-
-# Проверка прав
-def check_permission(user):
-    # Допустим, все проходят
-    return True
+            _log.debug("Менеджер требует одобрения администратора")
+            return Decision.PASS
+        _log.debug("Менеджер одобрил отмену заказа")
+        return Decision.APPROVE
+
+class Admin:
+    __slots__ = ()
+
+    def check(self, request: CancellationRequest) -> Decision:
+        _log.debug("Администратор окончательно одобряет отмену")
+        return Decision.APPROVE
+
+# Цепочка обработчиков проходится в одном цикле, без рекурсивных вызовов
+class HandlerChain:
+    __slots__ = ("handlers",)
+
+    def __init__(self, handlers: Iterable[Handler]) -> None:
+        self.handlers = list(handlers)
+
+    def run(self, request: CancellationRequest) -> None:
+        for handler in self.handlers:
+            decision = handler.check(request)
+            if decision is Decision.REJECT:
+                return
+            if decision is Decision.APPROVE:
+                request.approved = True
+                return
+
+# Сохранение и восстановление заказов
+def _save(payload: bytes, path: str) -> None:
+    with open(path, "wb") as f:
+        f.write(payload)
+
+def _load(path: str) -> list[dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.loads(f.read())
+
+def _rehydrate(data: Iterable[dict[str, Any]]) -> list[Order]:
+    return [OrderFactory.create_order(d["type"]).from_dict(d) for d in data]
 
 # -------------------------- MAIN --------------------------
 
-def main():
-    addr = Address("Ленина, 10", "Москва", "101000", "Россия")
+def main(verify: bool = False) -> None:
+    addr = make_address("Ленина, 10", "Москва", "101000", "Россия")
     customer = Customer("Иван Иванов", "ivan@mail.ru", "+7 999 123 4567", addr)
 
     order1 = OnlineOrder(
@@ -266,26 +482,26 @@ def main():
     order1.send_notification(order1.order_id)
 
     cancel_request = CancellationRequest(order1, reason="Передумал")
-    operator = CallCenterOperator()
-    manager = Manager()
-    admin = Admin()
-    operator.set_next(manager).set_next(admin)
-
-    if check_permission(operator):
-        operator.handle(cancel_request)
-
-    data = [order.to_dict() for order in customer.get_order_history()]
-    with open("orders.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-        print("Заказы сохранены в orders.json")
-
-    with open("orders.json", "r", encoding="utf-8") as f:
-        loaded_data = json.load(f)
-        restored_orders = [OrderFactory.create_order(d["type"]).from_dict(d) for d in loaded_data]
-        print("Загруженные заказы:")
-        for o in restored_orders:
-            print(o.track_status())
+    chain = HandlerChain([CallCenterOperator(), Manager(), Admin()])
+    chain.run(cancel_request)
+    # Выводим накопленный журнал до остального вывода, чтобы сохранить порядок сообщений
+    flush_logs()
+
+    payload = customer.serialize_json()
+    _save(payload, "orders.json")
+    print("Заказы сохранены в orders.json")
+
+    # Проверка: шаблонная запись совпадает с обычной сериализацией, файл читается обратно
+    if verify:
+        if payload != _dumps(customer.serialize_all()).encode("utf-8"):
+            raise ValueError("Сохранённые заказы не совпадают с эталонной сериализацией")
+        restored_orders: Iterable[Order] = _rehydrate(_load("orders.json"))
+    else:
+        restored_orders = customer.get_order_history()
+    print("Загруженные заказы:")
+    for o in restored_orders:
+        print(o.track_status())
 
 if __name__ == "__main__":
-    main()
+    main(verify="--verify" in sys.argv[1:])
     
\ No newline at end of file